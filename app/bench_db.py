@@ -0,0 +1,96 @@
+from __future__ import annotations
+import argparse
+import time
+import numpy as np
+from sqlalchemy import text
+from main_file import load_db_config, build_engine, run_sql, run_many
+
+# Latency of many small reads / writes:
+#   per_call     run_sql() per statement (pool checkout + own transaction)
+#   one_tx       one connection, one transaction, statements one by one
+#   pipeline     run_many(pipeline=True), psycopg only — total time and throughput only
+#   prepared     one_tx with prepare_threshold=0 vs None (never), psycopg only
+#
+#   python app/bench_db.py -n 2000
+
+READ_SQL = "SELECT laeq FROM noise_level_h WHERE station_id = :sid AND ts_hour_kst = :ts"
+WRITE_SQL = """
+    INSERT INTO _bench_write (id, v) VALUES (:id, :v)
+    ON CONFLICT (id) DO UPDATE SET v = EXCLUDED.v
+"""
+
+
+def _report(name, lat_s):
+    ms = np.asarray(lat_s) * 1000
+    print(f"  {name:<26} mean {ms.mean():7.3f} ms   p50 {np.percentile(ms, 50):7.3f} ms"
+          f"   p95 {np.percentile(ms, 95):7.3f} ms   total {ms.sum():8.1f} ms")
+
+
+def _report_batch(name, total_s, n):
+    # one round trip for the whole batch: no per-statement latency to report
+    print(f"  {name:<26} batch of {n}: total {total_s * 1000:8.1f} ms"
+          f"   {n / total_s:9.0f} statements/s")
+
+
+def _timed(fn, items):
+    lat = []
+    for it in items:
+        t0 = time.perf_counter()
+        fn(it)
+        lat.append(time.perf_counter() - t0)
+    return lat
+
+
+def _one_tx(engine, sql, items):
+    q = text(sql)
+    with engine.begin() as conn:
+        def step(p):
+            res = conn.execute(q, p)
+            return res.all() if res.returns_rows else None
+        return _timed(step, items)
+
+
+def bench(n, config_path="app/config.env"):
+    cfg = load_db_config(config_path)
+    keys = run_sql("""
+        SELECT station_id, ts_hour_kst FROM noise_level_h
+        ORDER BY random() LIMIT :n
+    """, {"n": n}, config_path=config_path) or []
+    if not keys:
+        print("noise_level_h is empty — load data first.")
+        return
+    reads = [{"sid": sid, "ts": ts} for sid, ts in keys]
+    writes = [{"id": i, "v": round(40 + (i % 400) / 10, 2)} for i in range(len(reads))]
+    run_sql("CREATE TABLE IF NOT EXISTS _bench_write (id INT PRIMARY KEY, v NUMERIC(6,2))",
+            config_path=config_path)
+
+    engine = build_engine(cfg)
+    try:
+        for label, sql, items in (("reads", READ_SQL, reads), ("writes", WRITE_SQL, writes)):
+            print(f"{label}: {len(items)} statements, driver={cfg['driver']}, "
+                  f"pool_size={cfg['pool_size']}")
+            _report("per_call (run_sql)", _timed(
+                lambda p: run_sql(sql, p, config_path=config_path), items))
+            _report("one_tx", _one_tx(engine, sql, items))
+
+            if cfg["driver"] != "psycopg":
+                print("  pipeline / prepared: skipped (set driver=psycopg in config.env)")
+                continue
+            t0 = time.perf_counter()
+            run_many([(sql, p) for p in items], config_path=config_path, pipeline=True)
+            _report_batch("pipeline (run_many)", time.perf_counter() - t0, len(items))
+            for thr in (None, 0):
+                eng = build_engine(cfg, prepare_threshold=thr)
+                try:
+                    _report(f"one_tx prepare_threshold={thr}", _one_tx(eng, sql, items))
+                finally:
+                    eng.dispose()
+    finally:
+        engine.dispose()
+        run_sql("DROP TABLE IF EXISTS _bench_write", config_path=config_path)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="DB latency benchmark")
+    ap.add_argument("-n", type=int, default=1000, help="statements per mode")
+    bench(ap.parse_args().n)
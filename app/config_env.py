@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+
+# ----------------Read config.env ----------------
+
+def read_config_env(path="app/config.env"):
+    """
+    key=value lines -> {key (lower case): value (quotes stripped)}; '#' lines are comments.
+    """
+    values = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+
+        for raw in f:
+            if "=" not in raw or raw.lstrip().startswith("#"):
+                continue
+            key, value = raw.split("=", 1)
+            values[key.strip().lower()] = value.strip().strip("'\"")
+    return values
@@ -0,0 +1,262 @@
+from __future__ import annotations
+from pathlib import Path
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+
+STORE_DIR = Path("data/store")
+INDEX_FILE = "index.json"
+
+# Store layout:
+#   data/store/index.json                    origin (KST day), n_hours (allocated), used_from/used_to
+#                                            (filled KST days), stations, watermark, generation
+#   data/store/gen_<g>/station_<id>.npy      float32[n_hours], LAeq per KST hour, NaN = no data
+# Hour i of every array is origin + i hours (KST); n_hours is always a multiple of 24,
+# so an array reshapes to (days, 24) without copying.
+# Arrays are allocated ahead in whole years (see _plan_calendar). Only rows outside the
+# allocation trigger a relayout: a complete new gen_<g+1>/ is written and only then is
+# index.json switched to it, so an interrupted refresh leaves the previous generation
+# consistent with the index.
+
+
+# ------------- Index ---------------
+
+def load_index(store_dir=STORE_DIR):
+    path = Path(store_dir) / INDEX_FILE
+    if not path.exists():
+        return {"origin": None, "n_hours": 0, "stations": [], "watermark": None, "generation": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_index(index, store_dir):
+    path = Path(store_dir) / INDEX_FILE
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    tmp.replace(path)
+
+
+def _gen_dir(store_dir, generation):
+    return Path(store_dir) / f"gen_{int(generation)}"
+
+
+def _station_path(store_dir, generation, station_id):
+    return _gen_dir(store_dir, generation) / f"station_{int(station_id)}.npy"
+
+
+def open_station(station_id, store_dir=STORE_DIR, index=None):
+    """
+    Memory-mapped (read-only) hourly series of one station; nothing is read until sliced.
+    """
+    index = index or load_index(store_dir)
+    arr = np.load(_station_path(store_dir, index["generation"], station_id), mmap_mode="r")
+    if len(arr) != index["n_hours"]:
+        raise ValueError(f"Store is inconsistent: station {station_id} has {len(arr)} hours, "
+                         f"index {index['n_hours']} — rebuild with refresh_store(full=True)")
+    return arr
+
+
+# ------------- Resize ---------------
+
+def _plan_calendar(origin, n_hours, lo_day, hi_day):
+    """
+    Allocated calendar (origin, n_hours) covering [lo_day, hi_day).
+    Allocation is in whole years and at least doubles when it grows, so normal appends land
+    inside the existing arrays and a full relayout happens O(log history) times.
+    """
+    lo_day, hi_day = np.datetime64(lo_day, "D"), np.datetime64(hi_day, "D")
+    span = 0
+    if origin is not None:
+        cur_lo = np.datetime64(origin, "D")
+        cur_hi = cur_lo + n_hours // 24
+        if cur_lo <= lo_day and hi_day <= cur_hi:
+            return str(cur_lo), n_hours
+        span = int((cur_hi - cur_lo).astype(int))
+    new_lo = lo_day.astype("datetime64[Y]").astype("datetime64[D]")
+    new_hi = ((hi_day - 1).astype("datetime64[Y]") + 1).astype("datetime64[D]")
+    if origin is not None:
+        new_lo, new_hi = min(new_lo, cur_lo), max(new_hi, cur_hi)
+        if hi_day > cur_hi:
+            new_hi = max(new_hi, new_lo + 2 * span)
+        if lo_day < cur_lo:
+            new_lo = min(new_lo, new_hi - 2 * span)
+    return str(new_lo), int((new_hi - new_lo).astype(int)) * 24
+
+
+def _relayout_station(src, dst, old_origin, old_n, new_origin, new_n):
+    """
+    Copy a station series onto a new calendar (front/back padding with NaN).
+    """
+    out = np.lib.format.open_memmap(
+        dst, mode="w+", dtype=np.float32, shape=(new_n,))
+    out[:] = np.nan
+    if src is not None and src.exists() and old_n:
+        shift = int((np.datetime64(old_origin, "h") -
+                    np.datetime64(new_origin, "h")).astype(int))
+        out[shift:shift + old_n] = np.load(src, mmap_mode="r")
+    out.flush()
+    del out
+
+
+# ------------- Incremental refresh from noise_level_h ---------------
+
+def refresh_store(conn, store_dir=STORE_DIR, full=False):
+    """
+    Pull rows of noise_level_h changed since the last refresh (updated_at watermark)
+    and write them into the per-station arrays. full=True rebuilds from scratch.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    index = load_index(store_dir)
+    old_gen = index.get("generation", 0)
+    if full:
+        index = {"origin": None, "n_hours": 0, "stations": [],
+                 "watermark": None, "generation": old_gen}
+
+    df = pd.read_sql(text("""
+        SELECT station_id, ts_hour_kst, laeq, COALESCE(updated_at, created_at) AS changed_at
+        FROM noise_level_h
+        WHERE (CAST(:since AS TIMESTAMP) IS NULL
+               OR COALESCE(updated_at, created_at) > CAST(:since AS TIMESTAMP))
+    """), conn, params={"since": index["watermark"]})
+    if df.empty:
+        print("Store is up to date.")
+        return index
+
+    ts = pd.to_datetime(df["ts_hour_kst"]).values.astype("datetime64[h]")
+    lo_day = ts.min().astype("datetime64[D]")
+    hi_day = ts.max().astype("datetime64[D]") + 1
+
+    # 1) grow the allocated calendar only if the new rows fall outside it
+    old_origin, old_n = index["origin"], index["n_hours"]
+    new_origin, new_n = _plan_calendar(old_origin, old_n, lo_day, hi_day)
+    used_from = min(lo_day, np.datetime64(index.get("used_from") or lo_day, "D"))
+    used_to = max(hi_day, np.datetime64(index.get("used_to") or hi_day, "D"))
+
+    station_ids = sorted(set(index["stations"]) |
+                         set(int(s) for s in df["station_id"].unique()))
+
+    # calendar changed (or full rebuild) -> lay every station out in a new generation
+    relayout = full or (new_origin, new_n) != (old_origin, old_n)
+    gen = old_gen + 1 if relayout else old_gen
+    _gen_dir(store_dir, gen).mkdir(parents=True, exist_ok=True)
+    for sid in station_ids:
+        dst = _station_path(store_dir, gen, sid)
+        if relayout or not dst.exists():
+            src = None if full or sid not in index["stations"] else _station_path(
+                store_dir, old_gen, sid)
+            _relayout_station(src, dst, old_origin, old_n, new_origin, new_n)
+
+    # 2) scatter the changed hours (vectorized per station); re-applying after a crash is harmless
+    pos = (ts - np.datetime64(new_origin, "h")).astype(np.int64)
+    vals = df["laeq"].to_numpy(dtype=np.float32)
+    sids = df["station_id"].to_numpy()
+    for sid in np.unique(sids):
+        mask = sids == sid
+        arr = np.load(_station_path(store_dir, gen, sid), mmap_mode="r+")
+        arr[pos[mask]] = vals[mask]
+        arr.flush()
+        del arr
+
+    # 3) switch the index (atomic replace), then drop the old generation
+    index.update({
+        "origin": new_origin,
+        "n_hours": new_n,
+        "used_from": str(used_from),
+        "used_to": str(used_to),
+        "stations": station_ids,
+        "watermark": str(pd.Timestamp(df["changed_at"].max())),
+        "generation": gen,
+    })
+    _save_index(index, store_dir)
+    if gen != old_gen:
+        shutil.rmtree(_gen_dir(store_dir, old_gen), ignore_errors=True)
+    print(f"Store refreshed: {len(df)} hours, {len(station_ids)} stations, "
+          f"{used_from} .. {used_to} (allocated {new_n // 24} days from {new_origin}"
+          f"{', relaid out' if relayout else ''})")
+    return index
+
+# ------------- Rollups (energy average, LAeq) ---------------
+
+
+def _energy_mean(levels, groups, n_groups):
+    """
+    LAeq per group: 10*log10(mean(10^(L/10))) over non-NaN values, via bincount.
+    """
+    ok = ~np.isnan(levels)
+    e = np.power(10.0, levels[ok].astype(np.float64) / 10.0)
+    g = groups[ok]
+    s = np.bincount(g, weights=e, minlength=n_groups)
+    n = np.bincount(g, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.round(10 * np.log10(s / n), 2), n
+
+
+def _used(index):
+    """
+    (first hour, end hour) of the filled range inside the allocated arrays, and its days.
+    """
+    origin = np.datetime64(index["origin"], "D")
+    d0 = np.datetime64(index.get("used_from") or origin, "D")
+    d1 = np.datetime64(index.get("used_to") or origin + index["n_hours"] // 24, "D")
+    i0, i1 = int((d0 - origin).astype(int)) * 24, int((d1 - origin).astype(int)) * 24
+    return i0, i1, d0 + np.arange((i1 - i0) // 24)
+
+
+def _weekday(days):
+    # 1970-01-01 was a Thursday (weekday 3); 0 = Monday
+    return (days.astype("datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def noise_calendar(station_id, store_dir=STORE_DIR):
+    """
+    Day x hour matrix (KST) of one station: rows = dates, columns = hours 0..23.
+    """
+    index = load_index(store_dir)
+    i0, i1, days = _used(index)
+    arr = open_station(station_id, store_dir, index)[i0:i1].reshape(-1, 24)
+    return pd.DataFrame(np.asarray(arr), index=pd.DatetimeIndex(days, name="d_kst"),
+                        columns=range(24))
+
+
+def hour_of_day_profile(station_id, store_dir=STORE_DIR):
+    index = load_index(store_dir)
+    i0, i1, _ = _used(index)
+    arr = open_station(station_id, store_dir, index)[i0:i1]
+    groups = np.tile(np.arange(24), len(arr) // 24)
+    laeq, n = _energy_mean(arr, groups, 24)
+    return pd.DataFrame({"hour_kst": np.arange(24), "laeq": laeq, "n_hours": n})
+
+
+def weekday_profile(station_id, store_dir=STORE_DIR):
+    """
+    0 = Monday ... 6 = Sunday.
+    """
+    index = load_index(store_dir)
+    i0, i1, days = _used(index)
+    arr = open_station(station_id, store_dir, index)[i0:i1]
+    laeq, n = _energy_mean(arr, np.repeat(_weekday(days), 24), 7)
+    return pd.DataFrame({"weekday": np.arange(7), "laeq": laeq, "n_hours": n})
+
+
+def month_profile(station_id, store_dir=STORE_DIR):
+    index = load_index(store_dir)
+    i0, i1, days = _used(index)
+    arr = open_station(station_id, store_dir, index)[i0:i1]
+    months, inv = np.unique(days.astype("datetime64[M]"), return_inverse=True)
+    laeq, n = _energy_mean(arr, np.repeat(inv, 24), len(months))
+    return pd.DataFrame({"month": months.astype("datetime64[D]"), "laeq": laeq, "n_hours": n})
+
+
+if __name__ == "__main__":
+    from main_file import connect_engine
+    engine = connect_engine()
+    with engine.connect() as conn:
+        index = refresh_store(conn)
+    for sid in index["stations"]:
+        print(f"--- station {sid} ---")
+        print(hour_of_day_profile(sid).to_string(index=False))
@@ -6,51 +6,88 @@ import re
 import pandas as pd
 from typing import Optional
 from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.engine import Engine, Connection, URL
 from functools import lru_cache
+from config_env import read_config_env
+from hour_store import refresh_store
+from period_payloads import refresh_payloads
+from quality import ensure_quality_tables, load_quality_config, run_quality, QualityError
 
 
 # ----------------Connect with config ----------------
 
-def load_db_config(path="app/config.env"):
+# Optional tuning keys in config.env (defaults below):
+#   driver=psycopg2 | psycopg      psycopg (v3) enables prepared statements and pipeline mode
+#   pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping
+#   prepare_threshold              psycopg only: prepare a statement after N executions
+#                                  (0 = at once, none or empty = never)
+#   pipeline=1                     psycopg only: run_many() sends statements in pipeline mode
+INT_KEYS = ("port", "pool_size", "max_overflow", "pool_timeout",
+            "pool_recycle", "prepare_threshold")
+BOOL_KEYS = ("pool_pre_ping", "pipeline")
 
-    data_dic = {"host": None, "port": 5432,
-                "user": None, "password": None, "database": None}
 
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+def load_db_config(path="app/config.env"):
 
-        for raw in f:
-            if "=" not in raw or raw.lstrip().startswith("#"):
-                continue
-            key, value = raw.split("=", 1)
-            key = key.strip().lower()
-            value = value.strip().strip("'\"")
-            if key in data_dic:
-                data_dic[key] = int(value) if key == "port" else value
+    data_dic = {"host": None, "port": 5432,
+                "user": None, "password": None, "database": None,
+                "driver": "psycopg2",
+                "pool_size": 5, "max_overflow": 10, "pool_timeout": 30,
+                "pool_recycle": 1800, "pool_pre_ping": True,
+                "prepare_threshold": 5, "pipeline": False}
+
+    for key, value in read_config_env(path).items():
+        if key in data_dic:
+            if key == "prepare_threshold" and value.lower() in ("", "none"):
+                data_dic[key] = None
+            elif key in INT_KEYS:
+                data_dic[key] = int(value)
+            elif key in BOOL_KEYS:
+                data_dic[key] = value.lower() in ("1", "true", "yes", "on")
+            else:
+                data_dic[key] = value
 
     for k in ("host", "user", "password", "database"):
         if not data_dic[k]:
             raise ValueError(f"В config.env - field not specified: {k}")
+    if data_dic["driver"] not in ("psycopg2", "psycopg"):
+        raise ValueError(f"В config.env - unknown driver: {data_dic['driver']}")
     return data_dic
 
 # !!! Enter personal password in config.env !!!
 
 
-@lru_cache(maxsize=1)
-def connect_engine(config_path: str = "app/config.env", *, echo: bool = False) -> Engine:
-
-    cfg = load_db_config(config_path)
-    db_url = (
-        f"postgresql+psycopg2://{cfg['user']}:{cfg['password']}"
-        f"@{cfg['host']}:{cfg['port']}/{cfg['database']}"
+def build_engine(cfg: dict, *, echo: bool = False, **overrides) -> Engine:
+    cfg = {**cfg, **overrides}
+    db_url = URL.create(
+        f"postgresql+{cfg['driver']}",
+        username=cfg["user"],
+        password=cfg["password"],
+        host=cfg["host"],
+        port=cfg["port"],
+        database=cfg["database"],
     )
-    print("DB URL:", db_url)
-    engine = create_engine(
+    connect_args = {}
+    if cfg["driver"] == "psycopg":
+        connect_args["prepare_threshold"] = cfg["prepare_threshold"]
+    return create_engine(
         db_url,
-        pool_pre_ping=True,
+        pool_size=cfg["pool_size"],
+        max_overflow=cfg["max_overflow"],
+        pool_timeout=cfg["pool_timeout"],
+        pool_recycle=cfg["pool_recycle"],
+        pool_pre_ping=cfg["pool_pre_ping"],
+        connect_args=connect_args,
         echo=echo,
         future=True,
     )
+
+
+@lru_cache(maxsize=1)
+def connect_engine(config_path: str = "app/config.env", *, echo: bool = False) -> Engine:
+
+    engine = build_engine(load_db_config(config_path), echo=echo)
+    print("DB URL:", engine.url.render_as_string(hide_password=True))
     return engine
 
 
@@ -83,6 +120,33 @@ def run_sql(sql: str, params: Optional[dict] = None, *, config_path: str = "app/
         except Exception:
             return None
 
+
+def run_many(statements, *, config_path: str = "app/config.env", pipeline: Optional[bool] = None):
+    """
+    Execute [(sql, params), ...] on one connection in one transaction.
+    Return list of rows per statement (None if not a SELECT).
+    With driver=psycopg and pipeline on, all statements are sent before waiting for replies.
+    """
+    if pipeline is None:
+        pipeline = load_db_config(config_path)["pipeline"]
+    with db_conn(config_path) as conn:
+        raw = conn.connection.driver_connection
+        if not (pipeline and hasattr(raw, "pipeline")):
+            out = []
+            for sql, params in statements:
+                res = conn.execute(text(sql), params or {})
+                out.append(res.all() if res.returns_rows else None)
+            return out
+
+        cursors = []
+        with raw.pipeline():
+            for sql, params in statements:
+                compiled = text(sql).compile(dialect=conn.dialect)
+                cur = raw.cursor()
+                cur.execute(str(compiled), compiled.construct_params(params or {}))
+                cursors.append(cur)
+        return [cur.fetchall() if cur.description else None for cur in cursors]
+
 # --------Find year in tables*.csv-----------
 
 
@@ -101,8 +165,10 @@ def find_year_month(df: pd.DataFrame):
 # --------Find hours/stations in tables*.csv---------
 
 
-def parse_sheet(df_raw, station_name):
+def parse_sheet(df_raw, station_name, keep_invalid=False):
     """
+    keep_invalid=True keeps rows with unparsable db_level (NaN) for quality checks.
+
     Return:
       long_df:     station_name | date | hour(1..24) | db_level
       hours:       list of hours (exp., [1..24])
@@ -160,7 +226,8 @@ def parse_sheet(df_raw, station_name):
         long_df["db_level"] = pd.to_numeric(
             long_df["db_level"].astype(str).str.replace(",", "."), errors="coerce"
         ).round(2)
-        long_df = long_df.dropna(subset=["hour", "db_level"])
+        long_df = long_df.dropna(
+            subset=["hour"] if keep_invalid else ["hour", "db_level"])
         long_df["station_name"] = station_name
         long_df["hour"] = long_df["hour"].astype(int)
         long_df = long_df[["station_name", "date", "hour", "db_level"]]
@@ -247,49 +314,153 @@ def ensure_tables(conn):
             PRIMARY KEY (station_id, ts_hour_kst)
         );
     """))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_stations_geom ON stations USING GIST (geom);"))
     conn.execute(text(
         "CREATE INDEX IF NOT EXISTS idx_h_station_ts  ON noise_level_h (station_id, ts_hour_kst);"))
+    # top-K over the whole history reads K index entries per station
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_h_station_laeq ON noise_level_h (station_id, laeq DESC, ts_hour_kst);"))
+    # watermark of hour_store.refresh_store / period_payloads.refresh_payloads
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_h_changed_at ON noise_level_h ((COALESCE(updated_at, created_at)));"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_d_changed_at ON noise_level_d ((COALESCE(updated_at, created_at)));"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS noise_exceedance_d (
+            station_id   INT NOT NULL REFERENCES stations(station_id) ON DELETE CASCADE,
+            thr_day      NUMERIC(5,2) NOT NULL,
+            thr_night    NUMERIC(5,2) NOT NULL,
+            d_kst        DATE NOT NULL,
+            n_day        INT,
+            n_night      INT,
+            over_day     INT,
+            over_night   INT,
+            updated_at   TIMESTAMP,
+            PRIMARY KEY (station_id, thr_day, thr_night, d_kst)
+        );
+    """))
     conn.execute(text(
         "CREATE INDEX IF NOT EXISTS idx_r_station_ts  ON noise_reading (station_id, ts_utc);"))
     conn.execute(text(
         "CREATE INDEX IF NOT EXISTS idx_noise_ts      ON noise_reading (ts_utc);"))
     conn.execute(text(
         "CREATE INDEX IF NOT EXISTS idx_noise_station ON noise_reading (station_id);"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_noise_src_month ON noise_reading (src_month);"))
+    # catalog of months moved to data/archive by retention.py
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS reading_archive(
+            src_month    DATE PRIMARY KEY,
+            file_path    TEXT NOT NULL,
+            n_rows       INT NOT NULL,
+            min_ts_utc   TIMESTAMPTZ,
+            max_ts_utc   TIMESTAMPTZ,
+            sha256       TEXT NOT NULL,
+            archived_at  TIMESTAMP DEFAULT now()
+        );
+    """))
 
 # ------- Insert data in table "stations" ----------
 
 
 def upsert_stations(names, conn):
-    for n in sorted(set(names)):
-        conn.execute(text("""
-            INSERT INTO stations(name, geom)
-            VALUES (:n, ST_SetSRID(ST_MakePoint(126.9780, 37.5665), 4326))
-            ON CONFLICT (name) DO NOTHING;
-        """), {"n": n})
+    """
+    New stations are inserted without geometry; coordinates come from update_geo().
+    """
+    conn.execute(text("""
+        INSERT INTO stations(name)
+        SELECT n
+        FROM unnest(CAST(:names AS TEXT[])) WITH ORDINALITY AS t(n, i)
+        ORDER BY i
+        ON CONFLICT (name) DO NOTHING;
+    """), {"names": sorted(set(names))})
 
 
 # ------------- Update station`s geo ---------------
-def update_geo(conn):
+STATIONS_GEO = Path("data/stations_geo.csv")
+
+
+def load_station_geo(path, conn):
+    """
+    Bulk upsert of station coordinates from CSV/XLSX with columns: name | lon | lat (WGS84).
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        geo = pd.read_excel(path)
+    else:
+        geo = pd.read_csv(path)
+    geo = geo[["name", "lon", "lat"]].dropna().drop_duplicates(
+        subset=["name"], keep="last")
+    geo["name"] = geo["name"].astype(str).str.strip()
+
+    conn.execute(text("DROP TABLE IF EXISTS _geo_tmp;"))
     conn.execute(text("""
-            UPDATE
-                stations s
-            SET
-                geom = ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326)
-            FROM
-                (
-                    VALUES
-                        (1, 127.0561, 37.54457),
-                        (2, 126.9769, 37.56470),
-                        (3, 127.0111, 37.51280),
-                        (4, 126.9429, 37.55950)
-                ) AS v(id, lon, lat)
-            WHERE
-                s.station_id = v.id;
-"""))
+        CREATE TEMP TABLE _geo_tmp(
+          name TEXT,
+          lon  DOUBLE PRECISION,
+          lat  DOUBLE PRECISION
+        ) ON COMMIT DROP;
+    """))
+    geo.to_sql("_geo_tmp", con=conn, if_exists="append", index=False)
+
+    conn.execute(text("""
+        INSERT INTO stations(name, geom)
+        SELECT name, ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+        FROM _geo_tmp
+        ON CONFLICT (name) DO UPDATE
+          SET geom = EXCLUDED.geom;
+    """))
+    return len(geo)
+
+
+def update_geo(conn, path=STATIONS_GEO):
+    if not Path(path).exists():
+        print(f"[INFO] No station coordinates file: {path}")
+        return 0
+    return load_station_geo(path, conn)
+
+
+def fetch_stations_bbox(conn, bbox=None):
+    """
+    Stations inside bbox = (min_lon, min_lat, max_lon, max_lat) with average day/night LAeq.
+    Uses the GiST index on stations.geom; bbox=None returns every located station.
+    """
+    where, params = "s.geom IS NOT NULL", {}
+    if bbox is not None:
+        where = "s.geom && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)"
+        params = dict(zip(("min_lon", "min_lat", "max_lon", "max_lat"), bbox))
+    q = text(f"""
+        SELECT
+            s.station_id,
+            s.name,
+            ST_Y(s.geom) AS lat,
+            ST_X(s.geom) AS lon,
+            d.laeq_day,
+            d.laeq_night
+        FROM stations s
+        LEFT JOIN LATERAL (
+            SELECT CAST(AVG(n.laeq_day)   AS NUMERIC(3,1)) AS laeq_day,
+                   CAST(AVG(n.laeq_night) AS NUMERIC(3,1)) AS laeq_night
+            FROM noise_level_d n
+            WHERE n.station_id = s.station_id
+        ) d ON TRUE
+        WHERE {where}
+        ORDER BY s.station_id;
+    """)
+    return pd.read_sql(q, conn, params=params)
 
 # ------- Insert data in table "noise_reading" -----
 
 
+def kst_to_utc(df):
+    """
+    UTC timestamps of long-frame rows: date + (hour-1)h in Asia/Seoul, as in insert_measurements.
+    """
+    local = pd.to_datetime(df["date"]) + pd.to_timedelta(df["hour"] - 1, unit="h")
+    return local.dt.tz_localize("Asia/Seoul").dt.tz_convert("UTC")
+
+
 def insert_measurements(df_all, conn):
     """
     Expect for columns: station_name (TEXT), date (DATE), hour (1..24), db_level (NUMERIC).
@@ -323,6 +494,24 @@ def insert_measurements(df_all, conn):
               part_of_day = EXCLUDED.part_of_day;
     """))
 
+# ------- Archived months (retention.py) -----
+
+
+def archived_months(conn):
+    return set(conn.execute(text("SELECT src_month FROM reading_archive")).scalars().all())
+
+
+def drop_archived(all_hours, archived):
+    """
+    Remove long-frame rows whose UTC month (noise_reading.src_month) is in the archive.
+    """
+    if all_hours.empty or not archived:
+        return all_hours, 0
+    src_month = (kst_to_utc(all_hours).dt.tz_localize(None)
+                 .dt.to_period("M").dt.to_timestamp().dt.date)
+    skip = src_month.isin(archived).to_numpy()
+    return all_hours[~skip].reset_index(drop=True), int(skip.sum())
+
 # ------- Insert data in table "noise_level_l" -----
 
 
@@ -336,8 +525,8 @@ def refresh_hours_from_readings(conn, from_utc=None, to_utc=None):
               10*LOG10( AVG(POWER(10, r.db_level/10.0)) )            AS laeq
           FROM noise_reading r
           WHERE r.db_level IS NOT NULL
-            AND (:from_utc IS NULL OR r.ts_utc >= :from_utc)
-            AND (:to_utc   IS NULL OR r.ts_utc   <  :to_utc)
+            AND (CAST(:from_utc AS TIMESTAMPTZ) IS NULL OR r.ts_utc >= :from_utc)
+            AND (CAST(:to_utc   AS TIMESTAMPTZ) IS NULL OR r.ts_utc <  :to_utc)
           GROUP BY r.station_id, date_trunc('hour', r.ts_utc AT TIME ZONE 'Asia/Seoul')
         )
         INSERT INTO noise_level_h (station_id, ts_hour_kst, n_samples, laeq, created_at, updated_at)
@@ -428,9 +617,9 @@ def fetch_peak_times(conn, station_id=None, date_from=None, date_to=None):
                             EXTRACT(HOUR FROM ts_hour_kst)::int AS h_kst,
                             laeq
                     FROM noise_level_h
-                    WHERE (:sid   IS NULL OR station_id = :sid)
-                        AND (:dfrom IS NULL OR ts_hour_kst::date >= :dfrom)
-                        AND (:dto   IS NULL OR ts_hour_kst::date <  :dto)
+                    WHERE (CAST(:sid   AS INT)  IS NULL OR station_id = :sid)
+                        AND (CAST(:dfrom AS DATE) IS NULL OR ts_hour_kst::date >= :dfrom)
+                        AND (CAST(:dto   AS DATE) IS NULL OR ts_hour_kst::date <  :dto)
                     ),
         day_peak AS (
                     SELECT DISTINCT ON (station_id, d_kst)
@@ -457,6 +646,155 @@ def fetch_peak_times(conn, station_id=None, date_from=None, date_to=None):
             columns=["kind"]).reset_index(drop=True),
     )
 
+# ------- Exceedance counters (noise_exceedance_d) -------
+# Day = KST 06:00-22:00 (ts_hour_kst hours 6..21), night = 22:00-06:00.
+# Counters are kept per KST day for these (day, night) thresholds in dB;
+# other thresholds are answered from noise_level_h directly.
+# After changing the split or the thresholds: python app/main_file.py --rebuild-exceedance
+EXCEEDANCE_THRESHOLDS = [(65, 55)]
+
+DAY_HOUR_SQL = "EXTRACT(HOUR FROM ts_hour_kst) BETWEEN 6 AND 21"
+
+
+def _window_sql(date_from, date_to, station_id=None, col="ts_hour_kst"):
+    """
+    Sargable WHERE for an optional [date_from, date_to) KST window and station.
+    """
+    cond, params = [], {}
+    if station_id is not None:
+        cond.append("station_id = :sid")
+        params["sid"] = station_id
+    if date_from is not None:
+        cond.append(f"{col} >= CAST(:dfrom AS DATE)")
+        params["dfrom"] = date_from
+    if date_to is not None:
+        cond.append(f"{col} <  CAST(:dto AS DATE)")
+        params["dto"] = date_to
+    return (" AND ".join(cond) or "TRUE"), params
+
+
+def refresh_exceedance(conn, date_from=None, date_to=None):
+    """
+    Recount hours above the thresholds per station and KST day for [date_from, date_to).
+    Without a window every counter is rebuilt from noise_level_h.
+    """
+    where, params = _window_sql(date_from, date_to)
+    # days without hours left and thresholds no longer listed must not keep old counters
+    d_where, _ = _window_sql(date_from, date_to, col="d_kst")
+    conn.execute(text(f"DELETE FROM noise_exceedance_d WHERE {d_where}"), params)
+    for thr_day, thr_night in EXCEEDANCE_THRESHOLDS:
+        conn.execute(text(f"""
+            INSERT INTO noise_exceedance_d
+                (station_id, thr_day, thr_night, d_kst, n_day, n_night, over_day, over_night, updated_at)
+            SELECT station_id, :thr_day, :thr_night, ts_hour_kst::date,
+                   COUNT(*) FILTER (WHERE {DAY_HOUR_SQL}),
+                   COUNT(*) FILTER (WHERE NOT {DAY_HOUR_SQL}),
+                   COUNT(*) FILTER (WHERE {DAY_HOUR_SQL}     AND laeq > :thr_day),
+                   COUNT(*) FILTER (WHERE NOT {DAY_HOUR_SQL} AND laeq > :thr_night),
+                   now()
+            FROM noise_level_h
+            WHERE {where}
+            GROUP BY station_id, ts_hour_kst::date;
+        """), {**params, "thr_day": thr_day, "thr_night": thr_night})
+
+
+def backfill_exceedance(conn):
+    """
+    Build the counters from the whole noise_level_h when a threshold pair has none yet
+    (new table, or a pair added to EXCEEDANCE_THRESHOLDS).
+    """
+    if conn.execute(text("SELECT 1 FROM noise_level_h LIMIT 1")).first() is None:
+        return
+    for thr_day, thr_night in EXCEEDANCE_THRESHOLDS:
+        if conn.execute(text("""
+            SELECT 1 FROM noise_exceedance_d
+            WHERE thr_day = :thr_day AND thr_night = :thr_night
+            LIMIT 1
+        """), {"thr_day": thr_day, "thr_night": thr_night}).first() is None:
+            print("noise_exceedance_d: backfilling from noise_level_h")
+            refresh_exceedance(conn)
+            return
+
+
+def rebuild_exceedance():
+    engine = connect_engine()
+    with engine.begin() as conn:
+        ensure_tables(conn)
+        refresh_exceedance(conn)
+        n = conn.execute(text("SELECT COUNT(*) FROM noise_exceedance_d")).scalar()
+    print(f"noise_exceedance_d rebuilt: {n} rows")
+
+# ------- Top-K loudest hours / exceedance duration -------
+
+
+def fetch_top_hours(conn, k=10, station_id=None, date_from=None, date_to=None):
+    """
+    K loudest hours per station in [date_from, date_to).
+    Per station: range scan of idx_h_station_ts for a window, or K entries of
+    idx_h_station_laeq without one — never a sort over the whole table.
+    """
+    where, params = _window_sql(date_from, date_to, col="h.ts_hour_kst")
+    sid_cond = "TRUE"
+    if station_id is not None:
+        sid_cond = "s.station_id = :sid"
+        params["sid"] = station_id
+    q = text(f"""
+        SELECT s.station_id,
+               t.rank,
+               t.ts_hour_kst::date                   AS d_kst,
+               EXTRACT(HOUR FROM t.ts_hour_kst)::int AS hour_kst,
+               t.laeq
+        FROM stations s
+        CROSS JOIN LATERAL (
+            SELECT h.ts_hour_kst, h.laeq,
+                   ROW_NUMBER() OVER (ORDER BY h.laeq DESC, h.ts_hour_kst) AS rank
+            FROM (
+                SELECT h.ts_hour_kst, h.laeq
+                FROM noise_level_h h
+                WHERE h.station_id = s.station_id AND {where}
+                ORDER BY h.laeq DESC, h.ts_hour_kst
+                LIMIT :k
+            ) h
+        ) t
+        WHERE {sid_cond}
+        ORDER BY s.station_id, t.rank
+    """)
+    return pd.read_sql(q, conn, params={**params, "k": k})
+
+
+def fetch_exceedance_hours(conn, thr_day=65, thr_night=55, station_id=None, date_from=None, date_to=None):
+    """
+    Hours above thr_day (day) / thr_night (night) per station in [date_from, date_to).
+    Uses noise_exceedance_d (one row per day) when the thresholds are precomputed.
+    """
+    if (thr_day, thr_night) in EXCEEDANCE_THRESHOLDS:
+        where, params = _window_sql(date_from, date_to, station_id, col="d_kst")
+        q = text(f"""
+            SELECT station_id,
+                   SUM(over_day)::int   AS hours_over_day,
+                   SUM(over_night)::int AS hours_over_night,
+                   SUM(n_day)::int      AS hours_day,
+                   SUM(n_night)::int    AS hours_night
+            FROM noise_exceedance_d
+            WHERE thr_day = :thr_day AND thr_night = :thr_night AND {where}
+            GROUP BY station_id
+            ORDER BY station_id
+        """)
+    else:
+        where, params = _window_sql(date_from, date_to, station_id)
+        q = text(f"""
+            SELECT station_id,
+                   COUNT(*) FILTER (WHERE {DAY_HOUR_SQL}     AND laeq > :thr_day)   AS hours_over_day,
+                   COUNT(*) FILTER (WHERE NOT {DAY_HOUR_SQL} AND laeq > :thr_night) AS hours_over_night,
+                   COUNT(*) FILTER (WHERE {DAY_HOUR_SQL})                          AS hours_day,
+                   COUNT(*) FILTER (WHERE NOT {DAY_HOUR_SQL})                      AS hours_night
+            FROM noise_level_h
+            WHERE {where}
+            GROUP BY station_id
+            ORDER BY station_id
+        """)
+    return pd.read_sql(q, conn, params={**params, "thr_day": thr_day, "thr_night": thr_night})
+
 # ------------- main -------------
 
 
@@ -466,6 +804,10 @@ def main():
         with engine.begin() as conn:
             ensure_database(conn)
             ensure_tables(conn)
+            ensure_quality_tables(conn)
+            backfill_exceedance(conn)
+
+        quality_cfg = load_quality_config()
 
         RAW_DIR = Path("data/raw")
         files = [p for p in RAW_DIR.glob(
@@ -483,7 +825,8 @@ def main():
             frames_h, frames_dn = [], []
             for sheet_name, df in sheets.items():
 
-                long_df, hours, daynight_df = parse_sheet(df, sheet_name)
+                long_df, hours, daynight_df = parse_sheet(
+                    df, sheet_name, keep_invalid=True)
                 print(
                     f"  - {sheet_name}: parsed hours={len(long_df)} rows; day/night={len(daynight_df)} rows")
                 if not long_df.empty:
@@ -519,7 +862,23 @@ def main():
                     .str.strip()
                 )
 
-            # 6) insert into database
+            # 6) data-quality validation (report is committed even if the file is rejected)
+            if not all_hours.empty:
+                try:
+                    all_hours = run_quality(
+                        path.name, all_hours, engine, **quality_cfg)
+                except QualityError as ex:
+                    print(f"SKIP (quality): {path.name}: {ex}")
+                    continue
+
+            # 6b) archived months stay in data/archive (rehydrate with retention.py to reload)
+            with engine.connect() as conn:
+                archived = archived_months(conn)
+            all_hours, n_skipped = drop_archived(all_hours, archived)
+            if n_skipped:
+                print(f"  archived months: {n_skipped} rows skipped")
+
+            # 7) insert into database
             with engine.begin() as conn:
 
                 names = pd.concat([
@@ -534,7 +893,16 @@ def main():
                     insert_measurements(all_hours, conn)
 
                 if not all_hours.empty:
-                    refresh_hours_from_readings(conn)
+                    # only the hours of this file, so updated_at marks just what changed
+                    ts_utc = kst_to_utc(all_hours)
+                    refresh_hours_from_readings(
+                        conn,
+                        from_utc=ts_utc.min(),
+                        to_utc=ts_utc.max() + pd.Timedelta(hours=1))
+                    refresh_exceedance(
+                        conn,
+                        date_from=min(all_hours["date"]),
+                        date_to=max(all_hours["date"]) + pd.Timedelta(days=1))
 
                 if not all_dn.empty:
                     if "date" in all_dn.columns:
@@ -544,6 +912,11 @@ def main():
             print(
                 f"OK: {path.name} → hours:{len(all_hours)}  day/night:{len(all_dn)}")
 
+        # 8) station x hour array store + time-slider map payloads (incremental)
+        with engine.connect() as conn:
+            refresh_store(conn)
+            refresh_payloads(conn)
+
         print("Done!")
 
     except Exception as _ex:
@@ -553,4 +926,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+    if "--rebuild-exceedance" in sys.argv:
+        rebuild_exceedance()
+    else:
+        main()
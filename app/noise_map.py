@@ -1,40 +1,59 @@
-from main_file import run_sql
-from pathlib import Path
+from main_file import db_conn, fetch_stations_bbox
 import folium
 import pandas as pd
 import numpy as np
 from folium import plugins
+from branca.element import MacroElement
+from jinja2 import Template
 
+SEOUL_BBOX = (126.85, 37.38, 127.15, 37.70)  # min_lon, min_lat, max_lon, max_lat
+CLUSTER_OFF_ZOOM = 16
 
-def main():
-    CONFIG = Path(__file__).resolve().parent / "config.env"
+# Markers are built client-side from a plain [lat, lon, popup, tooltip] array,
+# so the page stays light with thousands of stations.
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 8, color: "red", fill: true, fillOpacity: 0.9
+    });
+    marker.bindPopup(row[2], {maxWidth: 300});
+    marker.bindTooltip(row[3]);
+    return marker;
+};
+"""
 
-    rows = run_sql("""
-            SELECT 
-                ST_Y(s.geom) AS lat,
-                ST_X(s.geom) AS lon,
-                s.name,
-                CAST(AVG(n.laeq_day) AS NUMERIC(3,1)) AS laeq_day,
-                CAST(AVG(n.laeq_night) AS NUMERIC(3,1)) AS laeq_night
-            FROM stations s
-            LEFT JOIN noise_level_d n ON n.station_id = s.station_id
-            GROUP BY s.station_id, s.geom, s.name
-            ORDER BY s.station_id;
 
-    """)
+def _db_text(v):
+    return (v.round(1).astype(str) + " dB").where(v.notna(), "no data")
 
-    df = pd.DataFrame(
-        rows, columns=["lat", "lon", "name", "laeq_day", "laeq_night"])
+
+def popup_html(df):
+    day = df["laeq_day"].astype(float)
+    night = df["laeq_night"].astype(float)
+    avg = (day + night) / 2
+    return (
+        "<b>" + df["name"].astype(str) + "</b><br>"
+        + "🌞 Day: " + _db_text(day) + "<br>"
+        + "🌙 Night: " + _db_text(night) + "<br>"
+        + "📊 Average: " + _db_text(avg)
+    )
+
+
+def main(bbox=SEOUL_BBOX):
+    with db_conn() as conn:
+        df = fetch_stations_bbox(conn, bbox)
+
+    if df.empty:
+        print("No stations inside bbox:", bbox)
+        return
+
+    seoul_bounds = [[bbox[1], bbox[0]], [bbox[3], bbox[2]]]
 
     m = folium.Map(location=[df["lat"].mean(), df["lon"].mean()],
                    zoom_start=13,
-                   zoom_control=False,
-                   scrollWheelZoom=False,
-                   dragging=False,
                    tiles=None
                    )
 
-    seoul_bounds = [[37.38, 126.85], [37.70, 127.15]]
     folium.Rectangle(
         bounds=seoul_bounds,
         color=None,
@@ -52,7 +71,7 @@ def main():
     ).add_to(m)
 
     folium.Rectangle(
-        bounds=[[37.38, 126.85], [37.70, 127.15]],
+        bounds=seoul_bounds,
         color=None,
         fill=True,
         fill_color="lightgreen",
@@ -60,7 +79,8 @@ def main():
         z_index=0
     ).add_to(m)
 
-    heat_data = [[r["lat"], r["lon"], 1] for _, r in df.iterrows()]
+    heat_data = np.column_stack(
+        [df["lat"], df["lon"], np.ones(len(df))]).tolist()
 
     plugins.HeatMap(
         heat_data,
@@ -72,31 +92,149 @@ def main():
         z_index=2
     ).add_to(m)
 
-    for _, row in df.iterrows():
-        popup_text = (
-            f"<b>{row['name']}</b><br>"
-            f"🌞 Day: {row['laeq_day']} dB<br>"
-            f"🌙 Night: {row['laeq_night']} dB<br>"
-            f"📊 Average: {round((row['laeq_day'] + row['laeq_night']) / 2, 1)} dB"
-        )
-
-        folium.CircleMarker(
-            location=[row["lat"], row["lon"]],
-            radius=8,
-            color="red",
-            fill=True,
-            fill_opacity=0.9,
-            popup=folium.Popup(popup_text, max_width=300),
-            tooltip=row["name"]
-        ).add_to(m)
+    markers = pd.DataFrame({
+        "lat": df["lat"],
+        "lon": df["lon"],
+        "popup": popup_html(df),
+        "tooltip": df["name"].astype(str),
+    })
+    plugins.FastMarkerCluster(
+        markers.values.tolist(),
+        callback=MARKER_CALLBACK,
+        name="Stations",
+        # zoom splits clusters; from street level on every station is drawn individually
+        options={"disableClusteringAtZoom": CLUSTER_OFF_ZOOM},
+    ).add_to(m)
+
     m.fit_bounds(seoul_bounds)
-    m.options['minZoom'] = 13
-    m.options['maxZoom'] = 13
+    m.options['minZoom'] = 11
+    m.options['maxZoom'] = 18
+    m.options['maxBounds'] = seoul_bounds
 
     out = "web/step_noise_heatmap.html"
     m.save(out)
     print(f"✅ Карта сохранена: {out}")
 
 
+# ------------- Time-slider map (month / hour) ---------------
+# The HTML only holds the controls; stations.json and one <YYYY-MM>.json per month
+# (see period_payloads.py) are fetched when the slider moves and cached in the page.
+# Serve web/ over HTTP (python -m http.server -d web), browsers block fetch() on file://.
+
+TIMELINE_CONTROLS = """
+<div id="timeline" style="position:fixed; bottom:20px; left:50%; transform:translateX(-50%);
+     z-index:1000; background:white; padding:8px 14px; border-radius:6px;
+     box-shadow:0 1px 4px rgba(0,0,0,.3); font:13px sans-serif;">
+  <b id="tl-month">—</b>
+  <input id="tl-slider" type="range" min="0" max="0" value="0" style="width:260px">
+  <select id="tl-hour">
+    <option value="day">🌞 Day</option>
+    <option value="night">🌙 Night</option>
+  </select>
+</div>
+"""
+
+TIMELINE_SCRIPT = """
+(function () {
+    var map = {{ this._parent.get_name() }};
+    var base = "{{ this.payloads }}";
+    var cache = {}, markers = {}, months = [];
+    var hourSel = document.getElementById("tl-hour");
+    for (var h = 0; h < 24; h++) {
+        var o = document.createElement("option");
+        o.value = h; o.text = (h < 10 ? "0" : "") + h + ":00";
+        hourSel.appendChild(o);
+    }
+
+    function color(v) {
+        if (v === null || v === undefined) return "gray";
+        return v >= 70 ? "red" : v >= 65 ? "orange" : v >= 55 ? "yellow" : "green";
+    }
+
+    function load(month) {
+        if (!cache[month]) {
+            cache[month] = fetch(base + month + ".json").then(function (r) { return r.json(); });
+        }
+        return cache[month];
+    }
+
+    function render() {
+        var month = months[document.getElementById("tl-slider").value];
+        var mode = hourSel.value;
+        document.getElementById("tl-month").textContent = month;
+        load(month).then(function (p) {
+            Object.keys(markers).forEach(function (sid) {
+                var rec = p.stations[sid];
+                var v = !rec ? null : mode === "day" ? rec[0] : mode === "night" ? rec[1] : rec[2][+mode];
+                markers[sid].setStyle({color: color(v), fillColor: color(v)});
+                markers[sid].setPopupContent("<b>" + markers[sid].options.title + "</b><br>" +
+                    month + " · " + hourSel.options[hourSel.selectedIndex].text + ": " +
+                    (v === null || v === undefined ? "no data" : v + " dB"));
+            });
+        });
+    }
+
+    Promise.all([
+        fetch(base + "index.json").then(function (r) { return r.json(); }),
+        fetch(base + "stations.json").then(function (r) { return r.json(); })
+    ]).then(function (res) {
+        months = res[0].months;
+        res[1].forEach(function (s) {
+            markers[s[0]] = L.circleMarker([s[2], s[3]], {
+                radius: 10, fillOpacity: 0.85, title: s[1]
+            }).bindPopup("").bindTooltip(s[1]).addTo(map);
+        });
+        var slider = document.getElementById("tl-slider");
+        slider.max = Math.max(months.length - 1, 0);
+        slider.value = slider.max;
+        slider.oninput = render;
+        hourSel.onchange = render;
+        render();
+    });
+})();
+"""
+
+
+class TimelineControl(MacroElement):
+    """
+    Slider controls + loader script. As a child of the map its script is rendered
+    after the map's own L.map(...) call, so the map variable is already defined.
+    """
+    _template = Template(
+        "{% macro html(this, kwargs) %}" + TIMELINE_CONTROLS + "{% endmacro %}"
+        "{% macro script(this, kwargs) %}" + TIMELINE_SCRIPT + "{% endmacro %}"
+    )
+
+    def __init__(self, payloads="payloads/"):
+        super().__init__()
+        self._name = "TimelineControl"
+        self.payloads = payloads
+
+
+def timeline_main(bbox=SEOUL_BBOX, payloads="payloads/"):
+    seoul_bounds = [[bbox[1], bbox[0]], [bbox[3], bbox[2]]]
+    m = folium.Map(location=[(bbox[1] + bbox[3]) / 2, (bbox[0] + bbox[2]) / 2],
+                   zoom_start=12,
+                   tiles=None
+                   )
+    folium.raster_layers.TileLayer(
+        attr="Seoul Noise Map",
+        name="Base Map",
+        opacity=0.9,
+        control=False,
+    ).add_to(m)
+    m.fit_bounds(seoul_bounds)
+
+    TimelineControl(payloads).add_to(m)
+
+    out = "web/noise_timeline.html"
+    m.save(out)
+    print(f"✅ Карта сохранена: {out}")
+
+
 if __name__ == "__main__":
-    main()
+    import sys
+    if "--timeline" in sys.argv:
+        timeline_main()
+    else:
+        main()
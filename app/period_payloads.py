@@ -0,0 +1,140 @@
+from __future__ import annotations
+from pathlib import Path
+import json
+import pandas as pd
+from sqlalchemy import text
+
+
+PAYLOAD_DIR = Path("web/payloads")
+INDEX_FILE = "index.json"
+
+# Payload layout (loaded by web/noise_timeline.html on demand):
+#   web/payloads/index.json        {"months": ["2025-01", ...], "watermark": "..."}
+#   web/payloads/stations.json     [[station_id, name, lat, lon], ...]
+#   web/payloads/<YYYY-MM>.json    {"month": "2025-01",
+#                                   "stations": {"<id>": [laeq_day, laeq_night, [laeq h0..h23]]}}
+# LAeq values are energy averages over the month, rounded to 0.1 dB; null = no data.
+
+
+# ------------- Index ---------------
+
+def load_payload_index(out_dir=PAYLOAD_DIR):
+    path = Path(out_dir) / INDEX_FILE
+    if not path.exists():
+        return {"months": [], "watermark": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, obj):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    tmp.replace(path)
+
+
+def _num(v):
+    return None if pd.isna(v) else round(float(v), 1)
+
+# ------------- Changed months ---------------
+
+
+def changed_months(conn, since=None):
+    """
+    KST months touched in noise_level_d / noise_level_h after `since` (all months if None).
+    """
+    rows = conn.execute(text("""
+        SELECT date_trunc('month', d_kst)::date AS m
+        FROM noise_level_d
+        WHERE (CAST(:since AS TIMESTAMP) IS NULL
+               OR COALESCE(updated_at, created_at) > CAST(:since AS TIMESTAMP))
+        UNION
+        SELECT date_trunc('month', ts_hour_kst)::date
+        FROM noise_level_h
+        WHERE (CAST(:since AS TIMESTAMP) IS NULL
+               OR COALESCE(updated_at, created_at) > CAST(:since AS TIMESTAMP))
+        ORDER BY 1
+    """), {"since": since}).scalars().all()
+    return list(rows)
+
+# ------------- Build one month ---------------
+
+
+def build_month_payload(conn, month):
+    month = pd.Timestamp(month).date()
+    params = {"m": month}
+
+    dn = pd.read_sql(text("""
+        SELECT station_id,
+               10*LOG10(AVG(POWER(10, laeq_day/10.0)))   AS laeq_day,
+               10*LOG10(AVG(POWER(10, laeq_night/10.0))) AS laeq_night
+        FROM noise_level_d
+        WHERE d_kst >= :m AND d_kst < (:m + INTERVAL '1 month')
+        GROUP BY station_id
+    """), conn, params=params)
+
+    hh = pd.read_sql(text("""
+        SELECT station_id,
+               EXTRACT(HOUR FROM ts_hour_kst)::int     AS h_kst,
+               10*LOG10(AVG(POWER(10, laeq/10.0)))     AS laeq
+        FROM noise_level_h
+        WHERE ts_hour_kst >= :m AND ts_hour_kst < (:m + INTERVAL '1 month')
+        GROUP BY station_id, EXTRACT(HOUR FROM ts_hour_kst)::int
+    """), conn, params=params)
+
+    hours = (hh.pivot(index="station_id", columns="h_kst", values="laeq")
+             .reindex(columns=range(24)))
+    dn = dn.set_index("station_id")
+
+    stations = {}
+    for sid in sorted(set(dn.index) | set(hours.index)):
+        day = dn.at[sid, "laeq_day"] if sid in dn.index else None
+        night = dn.at[sid, "laeq_night"] if sid in dn.index else None
+        prof = hours.loc[sid].tolist() if sid in hours.index else [None] * 24
+        stations[str(int(sid))] = [_num(day), _num(night), [_num(v) for v in prof]]
+
+    return {"month": f"{month:%Y-%m}", "stations": stations}
+
+# ------------- Incremental refresh ---------------
+
+
+def refresh_payloads(conn, out_dir=PAYLOAD_DIR, full=False):
+    """
+    Rebuild only the month payloads whose aggregates changed since the last run.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = {"months": [], "watermark": None} if full else load_payload_index(out_dir)
+
+    watermark = conn.execute(text("""
+        SELECT GREATEST(
+            (SELECT MAX(COALESCE(updated_at, created_at)) FROM noise_level_d),
+            (SELECT MAX(COALESCE(updated_at, created_at)) FROM noise_level_h))
+    """)).scalar()
+    months = changed_months(conn, index["watermark"])
+
+    stations = conn.execute(text("""
+        SELECT station_id, name, ST_Y(geom) AS lat, ST_X(geom) AS lon
+        FROM stations
+        WHERE geom IS NOT NULL
+        ORDER BY station_id
+    """)).all()
+    _write_json(out_dir / "stations.json",
+                [[sid, name, round(lat, 6), round(lon, 6)] for sid, name, lat, lon in stations])
+
+    for m in months:
+        payload = build_month_payload(conn, m)
+        _write_json(out_dir / f"{payload['month']}.json", payload)
+
+    index["months"] = sorted(set(index["months"]) | {f"{m:%Y-%m}" for m in months})
+    index["watermark"] = str(watermark) if watermark is not None else index["watermark"]
+    _write_json(out_dir / INDEX_FILE, index)
+    print(f"Payloads refreshed: {len(months)} months ({len(index['months'])} total) → {out_dir}")
+    return index
+
+
+if __name__ == "__main__":
+    from main_file import connect_engine
+    engine = connect_engine()
+    with engine.connect() as conn:
+        refresh_payloads(conn)
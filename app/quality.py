@@ -0,0 +1,232 @@
+from __future__ import annotations
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from config_env import read_config_env
+
+
+# Plausible range for road-traffic LAeq (dB)
+MIN_DB = 20.0
+MAX_DB = 130.0
+# noise_reading.db_level is NUMERIC(5,2): larger values cannot be stored even with "keep"
+MAX_STORABLE_DB = 1000.0
+# Same value repeated for this many consecutive hours -> stuck sensor
+STUCK_HOURS = 6
+
+# flag -> "drop" (row is not loaded) | "keep" (loaded, only reported) | "fail" (whole file rejected)
+# Override in config.env: quality_<flag>=drop|keep|fail, quality_max_reject_ratio=0.5
+QUALITY_POLICY = {
+    "unparsable": "drop",
+    "out_of_range": "drop",
+    "duplicate": "drop",
+    "stuck": "keep",
+    "missing_hour": "keep",
+}
+# unparsable rows have no value and a duplicate would hit the same (station, ts) twice in
+# one upsert, so neither can be kept; a missing hour has no row to drop.
+# out_of_range "keep" keeps only values noise_reading can hold (|v| < MAX_STORABLE_DB)
+ALLOWED_ACTIONS = {
+    "unparsable": ("drop", "fail"),
+    "out_of_range": ("drop", "keep", "fail"),
+    "duplicate": ("drop", "fail"),
+    "stuck": ("drop", "keep", "fail"),
+    "missing_hour": ("keep", "fail"),
+}
+# Reject the whole file if more than this share of rows is dropped
+MAX_REJECT_RATIO = 0.5
+
+FLAGS = list(QUALITY_POLICY)
+
+
+class QualityError(ValueError):
+    def __init__(self, message, flags_df, summary):
+        super().__init__(message)
+        self.flags_df = flags_df
+        self.summary = summary
+
+
+# ------ Policy from config.env -------
+
+def check_policy(policy):
+    policy = {**QUALITY_POLICY, **(policy or {})}
+    for flag, action in policy.items():
+        if flag not in ALLOWED_ACTIONS:
+            raise ValueError(f"Unknown quality flag: {flag}")
+        if action not in ALLOWED_ACTIONS[flag]:
+            raise ValueError(f"quality_{flag}={action} is not allowed, "
+                             f"use one of: {', '.join(ALLOWED_ACTIONS[flag])}")
+    return policy
+
+
+def load_quality_config(path="app/config.env"):
+    """
+    Return {"policy": {...}, "max_reject_ratio": float}; missing keys keep the defaults.
+    """
+    policy, ratio = dict(QUALITY_POLICY), MAX_REJECT_RATIO
+    values = read_config_env(path) if Path(path).exists() else {}
+    for key, value in values.items():
+        if key == "quality_max_reject_ratio":
+            ratio = float(value)
+        elif key.startswith("quality_"):
+            policy[key[len("quality_"):]] = value.lower()
+    return {"policy": check_policy(policy), "max_reject_ratio": ratio}
+
+
+# ------ Create quality tables -------
+
+def ensure_quality_tables(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS quality_flag(
+            file_name    TEXT NOT NULL,
+            station_name TEXT NOT NULL,
+            d_kst        DATE,
+            hour         INT,
+            db_level     DOUBLE PRECISION,
+            flag         TEXT NOT NULL,
+            action       TEXT NOT NULL,
+            checked_at   TIMESTAMP DEFAULT now()
+        );
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS quality_summary(
+            file_name      TEXT NOT NULL,
+            station_name   TEXT NOT NULL,
+            n_rows         INT,
+            n_unparsable   INT,
+            n_out_of_range INT,
+            n_duplicate    INT,
+            n_stuck        INT,
+            n_missing_hour INT,
+            n_rejected     INT,
+            checked_at     TIMESTAMP DEFAULT now(),
+            PRIMARY KEY (file_name, station_name)
+        );
+    """))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_quality_flag_file ON quality_flag (file_name);"))
+
+# ------ Validate long frame -------
+
+
+def validate_hours(long_df, policy=None, max_reject_ratio=MAX_REJECT_RATIO):
+    """
+    Expect for columns: station_name | date | hour(1..24) | db_level (NaN = unparsable).
+    All checks are column operations over the whole frame.
+
+    Return:
+      clean_df:  rows to load (without NaN db_level)
+      flags_df:  station_name | date | hour | db_level | flag | action
+      summary:   one row per station with counts per flag
+    """
+    policy = check_policy(policy)
+    df = long_df.sort_values(["station_name", "date", "hour"],
+                             kind="stable").reset_index(drop=True)
+    lvl = df["db_level"].to_numpy(dtype=np.float64)
+    st = df["station_name"].to_numpy()
+
+    masks = {}
+    masks["unparsable"] = np.isnan(lvl)
+    with np.errstate(invalid="ignore"):
+        masks["out_of_range"] = (lvl < MIN_DB) | (lvl > MAX_DB)
+        unstorable = np.abs(lvl) >= MAX_STORABLE_DB
+    # every repeat after the first (station, date, hour) is a duplicate
+    masks["duplicate"] = df.duplicated(
+        subset=["station_name", "date", "hour"], keep="first").to_numpy()
+
+    # stuck: runs of the same value inside one station, run length via cumsum ids
+    same = np.zeros(len(df), dtype=bool)
+    if len(df) > 1:
+        same[1:] = (lvl[1:] == lvl[:-1]) & (st[1:] == st[:-1])
+    run_id = np.cumsum(~same)
+    run_len = np.bincount(run_id)[run_id]
+    masks["stuck"] = (run_len >= STUCK_HOURS) & ~masks["unparsable"]
+
+    flagged = []
+    for flag in ("unparsable", "out_of_range", "duplicate", "stuck"):
+        m = masks[flag]
+        if m.any():
+            f = df.loc[m, ["station_name", "date", "hour", "db_level"]].copy()
+            f["flag"] = flag
+            flagged.append(f)
+
+    # missing hours: (station, date) x 1..24 minus what is present
+    present = pd.MultiIndex.from_frame(df[["station_name", "date", "hour"]])
+    days = df[["station_name", "date"]].drop_duplicates()
+    expected = pd.MultiIndex.from_frame(
+        days.loc[days.index.repeat(24)].assign(hour=np.tile(np.arange(1, 25), len(days))))
+    missing = expected.difference(present)
+    if len(missing):
+        f = missing.to_frame(index=False)
+        f["db_level"] = np.nan
+        f["flag"] = "missing_hour"
+        flagged.append(f)
+
+    cols = ["station_name", "date", "hour", "db_level", "flag", "action"]
+    flags_df = pd.concat(flagged, ignore_index=True) if flagged else pd.DataFrame(
+        columns=cols[:-1])
+    flags_df["action"] = flags_df["flag"].map(policy)
+    too_big = flags_df["db_level"].astype(float).abs() >= MAX_STORABLE_DB
+    flags_df.loc[(flags_df["flag"] == "out_of_range") & too_big, "action"] = "drop"
+    flags_df = flags_df[cols]
+
+    drop = unstorable.copy()
+    for flag in ("unparsable", "out_of_range", "duplicate", "stuck"):
+        if policy[flag] == "drop":
+            drop |= masks[flag]
+    clean_df = df.loc[~drop].reset_index(drop=True)
+
+    counts = pd.crosstab(flags_df["station_name"], flags_df["flag"]).reindex(
+        columns=FLAGS, fill_value=0) if not flags_df.empty else pd.DataFrame(columns=FLAGS)
+    summary = (
+        df.groupby("station_name").size().rename("n_rows").to_frame()
+        .join(counts.add_prefix("n_"))
+        .join(pd.Series(st[drop]).value_counts().rename("n_rejected"))
+        .fillna(0).astype(int)
+        .reset_index()
+    )
+
+    failed = [f for f in FLAGS if policy[f] == "fail" and (flags_df["flag"] == f).any()]
+    if failed:
+        raise QualityError(f"quality check failed: {', '.join(failed)}",
+                           flags_df, summary)
+    if len(df) and drop.mean() > max_reject_ratio:
+        raise QualityError(f"quality check failed: {drop.mean():.0%} of rows rejected",
+                           flags_df, summary)
+
+    return clean_df, flags_df, summary
+
+# ------ Write quality results -------
+
+
+def insert_quality(file_name, flags_df, summary, conn):
+    conn.execute(text("DELETE FROM quality_flag    WHERE file_name = :f"), {"f": file_name})
+    conn.execute(text("DELETE FROM quality_summary WHERE file_name = :f"), {"f": file_name})
+
+    flags = flags_df.rename(columns={"date": "d_kst"}).assign(file_name=file_name)
+    flags.to_sql("quality_flag", con=conn, if_exists="append", index=False)
+    summary.assign(file_name=file_name).to_sql(
+        "quality_summary", con=conn, if_exists="append", index=False)
+
+
+def run_quality(file_name, long_df, engine, policy=None, max_reject_ratio=MAX_REJECT_RATIO):
+    """
+    Validate + persist the report in its own committed transaction, so it is kept
+    even when the file is rejected. Return clean_df or raise QualityError.
+    """
+    t0 = time.perf_counter()
+    rejected = None
+    try:
+        clean_df, flags_df, summary = validate_hours(long_df, policy, max_reject_ratio)
+    except QualityError as ex:
+        rejected, flags_df, summary = ex, ex.flags_df, ex.summary
+    with engine.begin() as conn:
+        insert_quality(file_name, flags_df, summary, conn)
+    if rejected is not None:
+        raise rejected
+
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"  quality: {len(flags_df)} flags, "
+          f"{len(long_df) - len(clean_df)} rejected ({ms:.0f} ms)")
+    return clean_df
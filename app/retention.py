@@ -0,0 +1,222 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import hashlib
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from main_file import connect_engine, ensure_tables, refresh_hours_from_readings
+
+
+ARCHIVE_DIR = Path("data/archive")
+KEEP_MONTHS = 3
+
+# Catalog table reading_archive and idx_noise_src_month are created by main_file.ensure_tables.
+# Archive file = one UTC month of noise_reading (src_month), columnar, zip-compressed .npz:
+#   station_id  int32
+#   ts_utc      int64    epoch seconds
+#   db_centi    int32    db_level * 100 (NUMERIC(5,2) round-trips exactly)
+#   part        uint8    0 = NULL, 1 = day, 2 = night
+PARTS = np.array([None, "day", "night"], dtype=object)
+
+
+# ------ Helpers -------
+
+
+def _month(m):
+    return pd.Timestamp(m).to_period("M").to_timestamp().date()
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _archive_path(archive_dir, month):
+    """
+    A new file per archive run: the file the catalog points to is never overwritten.
+    """
+    stamp = pd.Timestamp.now(tz="UTC").strftime("%Y%m%dT%H%M%S%f")
+    return Path(archive_dir) / f"noise_reading_{month:%Y-%m}_{stamp}.npz"
+
+
+def remove_obsolete(paths):
+    """
+    Delete archive files replaced or rehydrated in a transaction — call only after it committed.
+    """
+    for p in paths:
+        Path(p).unlink(missing_ok=True)
+        print(f"  removed {p}")
+
+# ------ Archive one month -------
+
+
+def archive_month(conn, month, archive_dir=ARCHIVE_DIR, obsolete=None):
+    """
+    noise_reading[src_month] -> .npz file + reading_archive row, then DELETE from the hot table.
+    Hourly aggregates of the month are refreshed first, so they stay final after the delete.
+    A replaced archive file is appended to `obsolete` (remove it after commit).
+    """
+    month = _month(month)
+    next_month = (pd.Timestamp(month) + pd.offsets.MonthBegin(1)).date()
+
+    # a month archived earlier got new rows -> merge the old archive back first
+    if conn.execute(text("SELECT 1 FROM reading_archive WHERE src_month = :m"),
+                    {"m": month}).first():
+        rehydrate_month(conn, month, obsolete)
+
+    refresh_hours_from_readings(
+        conn,
+        from_utc=pd.Timestamp(month).tz_localize("UTC"),
+        to_utc=pd.Timestamp(next_month).tz_localize("UTC"))
+
+    df = pd.read_sql(text("""
+        SELECT station_id, ts_utc, db_level, part_of_day
+        FROM noise_reading
+        WHERE src_month = :m
+        ORDER BY station_id, ts_utc
+    """), conn, params={"m": month})
+    if df.empty:
+        print(f"  {month:%Y-%m}: nothing to archive")
+        return 0
+
+    ts = pd.to_datetime(df["ts_utc"], utc=True)
+    part = np.zeros(len(df), dtype=np.uint8)
+    part[(df["part_of_day"] == "day").to_numpy()] = 1
+    part[(df["part_of_day"] == "night").to_numpy()] = 2
+
+    path = _archive_path(archive_dir, month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    # a crash after this point leaves at most an orphan file; the catalog still points to the old one
+    np.savez_compressed(
+        tmp,
+        station_id=df["station_id"].to_numpy(dtype=np.int32),
+        ts_utc=ts.dt.tz_localize(None).to_numpy().astype(
+            "datetime64[s]").astype(np.int64),
+        db_centi=np.round(df["db_level"].astype(float).to_numpy() * 100).astype(np.int32),
+        part=part,
+    )
+    tmp.replace(path)
+
+    conn.execute(text("""
+        INSERT INTO reading_archive (src_month, file_path, n_rows, min_ts_utc, max_ts_utc, sha256, archived_at)
+        VALUES (:m, :path, :n, :min_ts, :max_ts, :sha, now())
+        ON CONFLICT (src_month) DO UPDATE
+        SET file_path   = EXCLUDED.file_path,
+            n_rows      = EXCLUDED.n_rows,
+            min_ts_utc  = EXCLUDED.min_ts_utc,
+            max_ts_utc  = EXCLUDED.max_ts_utc,
+            sha256      = EXCLUDED.sha256,
+            archived_at = now();
+    """), {"m": month, "path": str(path), "n": len(df),
+           "min_ts": ts.min(), "max_ts": ts.max(), "sha": _sha256(path)})
+    conn.execute(text("DELETE FROM noise_reading WHERE src_month = :m"), {"m": month})
+
+    print(f"  {month:%Y-%m}: archived {len(df)} rows → {path} "
+          f"({path.stat().st_size / 1024:.0f} KB)")
+    return len(df)
+
+# ------ Rehydrate one month -------
+
+
+def rehydrate_month(conn, month, obsolete=None):
+    """
+    Restore an archived month into noise_reading (rows already present are kept) and drop it from the catalog.
+    The archive file is appended to `obsolete` (remove it after commit).
+    """
+    month = _month(month)
+    row = conn.execute(text("""
+        SELECT file_path, n_rows, sha256 FROM reading_archive WHERE src_month = :m
+    """), {"m": month}).first()
+    if row is None:
+        raise ValueError(f"Month not archived: {month:%Y-%m}")
+    path, n_rows, sha = row
+    if _sha256(path) != sha:
+        raise ValueError(f"Archive checksum mismatch: {path}")
+
+    with np.load(path) as z:
+        df = pd.DataFrame({
+            "station_id": z["station_id"],
+            "ts_utc": pd.to_datetime(z["ts_utc"], unit="s", utc=True),
+            "db_level": z["db_centi"] / 100.0,
+            "part_of_day": PARTS[z["part"]],
+        })
+    if len(df) != n_rows:
+        raise ValueError(f"Archive row count mismatch: {path}")
+
+    conn.execute(text("DROP TABLE IF EXISTS _archive_tmp;"))
+    conn.execute(text("""
+        CREATE TEMP TABLE _archive_tmp(
+          station_id  INT,
+          ts_utc      TIMESTAMPTZ,
+          db_level    NUMERIC(5,2),
+          part_of_day TEXT
+        ) ON COMMIT DROP;
+    """))
+    df.to_sql("_archive_tmp", con=conn, if_exists="append", index=False)
+    conn.execute(text("""
+        INSERT INTO noise_reading(station_id, ts_utc, db_level, part_of_day)
+        SELECT station_id, ts_utc, db_level, part_of_day
+        FROM _archive_tmp
+        ON CONFLICT (station_id, ts_utc) DO NOTHING;
+    """))
+    conn.execute(text("DROP TABLE _archive_tmp;"))
+    conn.execute(text("DELETE FROM reading_archive WHERE src_month = :m"), {"m": month})
+    if obsolete is not None:
+        obsolete.append(path)
+
+    print(f"  {month:%Y-%m}: rehydrated {len(df)} rows from {path}")
+    return len(df)
+
+# ------ Retention job -------
+
+
+def run_retention(conn, keep_months=KEEP_MONTHS, archive_dir=ARCHIVE_DIR, obsolete=None):
+    """
+    Archive every month of noise_reading older than the last `keep_months` months.
+    """
+    months = conn.execute(text("""
+        SELECT DISTINCT src_month
+        FROM noise_reading
+        WHERE src_month < date_trunc('month', now()) - make_interval(months => :keep)
+        ORDER BY src_month
+    """), {"keep": keep_months}).scalars().all()
+    total = sum(archive_month(conn, m, archive_dir, obsolete) for m in months)
+    print(f"Retention: {len(months)} months, {total} rows archived")
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="noise_reading retention")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("archive", help="archive months older than --keep-months")
+    a.add_argument("--keep-months", type=int, default=KEEP_MONTHS)
+    a.add_argument("--month", help="archive only this month (YYYY-MM)")
+    r = sub.add_parser("rehydrate", help="restore an archived month")
+    r.add_argument("month", help="YYYY-MM")
+    sub.add_parser("list", help="show the archive catalog")
+    args = ap.parse_args()
+
+    obsolete = []
+    engine = connect_engine()
+    with engine.begin() as conn:
+        ensure_tables(conn)
+        if args.cmd == "archive" and args.month:
+            archive_month(conn, args.month, obsolete=obsolete)
+        elif args.cmd == "archive":
+            run_retention(conn, args.keep_months, obsolete=obsolete)
+        elif args.cmd == "rehydrate":
+            rehydrate_month(conn, args.month, obsolete)
+        else:
+            print(pd.read_sql(text(
+                "SELECT * FROM reading_archive ORDER BY src_month"), conn).to_string(index=False))
+    # committed -> the catalog no longer references these files
+    remove_obsolete(obsolete)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@ CREATE DATABASE IF NOT EXISTS noisemap;
 
 CREATE TABLE stations (
     station_id INT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-    name TEXT NOT NULL,
-    geom geometry(Point, 4326) NOT NULL
+    name TEXT UNIQUE NOT NULL,
+    geom geometry(Point, 4326)
 );
 
 CREATE TABLE IF NOT EXISTS noise_reading (
@@ -47,8 +47,44 @@ CREATE TABLE IF NOT EXISTS noise_level_h (
     PRIMARY KEY (station_id, ts_hour_kst)
 );
 
+CREATE TABLE IF NOT EXISTS noise_exceedance_d (
+    station_id INT NOT NULL REFERENCES stations(station_id) ON DELETE CASCADE,
+    thr_day NUMERIC(5, 2) NOT NULL,
+    thr_night NUMERIC(5, 2) NOT NULL,
+    d_kst DATE NOT NULL,
+    -- часы с данными (день 06:00-22:00 KST / ночь)
+    n_day INT,
+    n_night INT,
+    -- часы выше порога
+    over_day INT,
+    over_night INT,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (station_id, thr_day, thr_night, d_kst)
+);
+
+CREATE INDEX IF NOT EXISTS idx_h_station_laeq ON noise_level_h (station_id, laeq DESC, ts_hour_kst);
+
+CREATE INDEX IF NOT EXISTS idx_h_changed_at ON noise_level_h ((COALESCE(updated_at, created_at)));
+
+CREATE INDEX IF NOT EXISTS idx_d_changed_at ON noise_level_d ((COALESCE(updated_at, created_at)));
+
+CREATE INDEX IF NOT EXISTS idx_stations_geom ON stations USING GIST (geom);
+
 CREATE INDEX IF NOT EXISTS idx_noise_reading_station_ts ON noise_reading (station_id, ts_utc);
 
 CREATE INDEX idx_noise_ts ON noise_reading(ts_utc);
 
-CREATE INDEX idx_noise_station ON noise_reading(station_id);
\ No newline at end of file
+CREATE INDEX idx_noise_station ON noise_reading(station_id);
+
+CREATE INDEX IF NOT EXISTS idx_noise_src_month ON noise_reading (src_month);
+
+CREATE TABLE IF NOT EXISTS reading_archive (
+    src_month DATE PRIMARY KEY,
+    -- архив месяца noise_reading (data/archive/*.npz)
+    file_path TEXT NOT NULL,
+    n_rows INT NOT NULL,
+    min_ts_utc TIMESTAMPTZ,
+    max_ts_utc TIMESTAMPTZ,
+    sha256 TEXT NOT NULL,
+    archived_at TIMESTAMP DEFAULT now()
+);
\ No newline at end of file
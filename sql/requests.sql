@@ -32,18 +32,15 @@ ORDER BY
     s.name,
     hour_local;
 
---
-UPDATE
-    stations s
-SET
-    geom = ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326)
+-- Станции в пределах bbox (координаты — data/stations_geo.csv, индекс idx_stations_geom):
+SELECT
+    s.station_id,
+    s.name,
+    ST_X(s.geom) AS lon,
+    ST_Y(s.geom) AS lat
 FROM
-    (
-        VALUES
-            (5, 127.0561, 37.54457),
-            (6, 126.9769, 37.56470),
-            (7, 127.0111, 37.51280),
-            (8, 126.9429, 37.55950)
-    ) AS v(id, lon, lat)
+    stations s
 WHERE
-    s.station_id = v.id;
\ No newline at end of file
+    s.geom && ST_MakeEnvelope(126.85, 37.38, 127.15, 37.70, 4326)
+ORDER BY
+    s.station_id;
\ No newline at end of file
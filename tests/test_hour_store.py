@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import hour_store as hs  # noqa: E402
+
+
+def test_weekday_mapping():
+    days = np.arange(np.datetime64("2025-01-05"), np.datetime64("2025-01-12"))
+    # 2025-01-05 is a Sunday
+    assert hs._weekday(days).tolist() == [6, 0, 1, 2, 3, 4, 5]
+
+
+def test_energy_mean_nan_and_empty_group():
+    levels = np.array([60.0, 70.0, np.nan, 50.0], dtype=np.float32)
+    groups = np.array([0, 0, 1, 2])
+    laeq, n = hs._energy_mean(levels, groups, 4)
+    assert laeq[0] == pytest.approx(10 * np.log10((10 ** 6 + 10 ** 7) / 2), abs=0.01)
+    assert np.isnan(laeq[1]) and np.isnan(laeq[3])
+    assert laeq[2] == pytest.approx(50.0)
+    assert n.tolist() == [2, 0, 1, 0]
+
+
+def test_relayout_shift(tmp_path):
+    src = tmp_path / "src.npy"
+    np.save(src, np.arange(48, dtype=np.float32))
+    dst = tmp_path / "dst.npy"
+    # old calendar starts one day after the new one
+    hs._relayout_station(src, dst, "2025-01-02", 48, "2025-01-01", 96)
+    out = np.load(dst)
+    assert np.isnan(out[:24]).all() and np.isnan(out[72:]).all()
+    assert out[24:72].tolist() == list(range(48))
+
+
+def test_plan_calendar_allocates_ahead():
+    origin, n = hs._plan_calendar(None, 0, "2025-01-10", "2025-01-13")
+    assert (origin, n) == ("2025-01-01", 365 * 24)
+    # later days of the same year fit without a relayout
+    assert hs._plan_calendar(origin, n, "2025-06-01", "2025-07-01") == (origin, n)
+    # growing past the end at least doubles the allocation
+    origin2, n2 = hs._plan_calendar(origin, n, "2026-01-01", "2026-01-02")
+    assert origin2 == origin and n2 >= 2 * n
+
+
+def _load_hours(engine, start, n_days):
+    ts = pd.date_range(start, periods=24 * n_days, freq="h")
+    pd.DataFrame({
+        "station_id": 1,
+        "ts_hour_kst": ts,
+        "laeq": 60 + (np.arange(len(ts)) % 24) / 10,
+        "updated_at": None,
+        "created_at": "2025-01-01 00:00:00",
+    }).to_sql("noise_level_h", engine, if_exists="replace", index=False)
+
+
+def test_append_day_writes_in_place(tmp_path):
+    engine = sqlalchemy.create_engine("sqlite://")
+    _load_hours(engine, "2025-01-10", 3)
+    with engine.connect() as conn:
+        first = hs.refresh_store(conn, tmp_path)
+    _load_hours(engine, "2025-01-10", 4)
+    with engine.connect() as conn:
+        second = hs.refresh_store(conn, tmp_path)
+
+    assert second["generation"] == first["generation"]
+    assert second["n_hours"] == first["n_hours"]
+    assert (second["used_from"], second["used_to"]) == ("2025-01-10", "2025-01-14")
+    cal = hs.noise_calendar(1, tmp_path)
+    assert len(cal) == 4 and cal.notna().all().all()
+    assert hs.hour_of_day_profile(1, tmp_path)["n_hours"].tolist() == [4] * 24
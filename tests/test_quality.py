@@ -0,0 +1,97 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from quality import (  # noqa: E402
+    QualityError, check_policy, load_quality_config, run_quality, validate_hours)
+
+
+def _long_df(levels):
+    return pd.DataFrame({
+        "station_name": "시청",
+        "date": date(2025, 1, 1),
+        "hour": np.arange(1, len(levels) + 1),
+        "db_level": levels,
+    })
+
+
+@pytest.fixture
+def engine():
+    # same columns as ensure_quality_tables, in SQLite types
+    eng = sqlalchemy.create_engine("sqlite://")
+    with eng.begin() as conn:
+        conn.exec_driver_sql("""
+            CREATE TABLE quality_flag(
+                file_name TEXT, station_name TEXT, d_kst DATE, hour INT,
+                db_level REAL, flag TEXT, action TEXT, checked_at TIMESTAMP)
+        """)
+        conn.exec_driver_sql("""
+            CREATE TABLE quality_summary(
+                file_name TEXT, station_name TEXT, n_rows INT, n_unparsable INT,
+                n_out_of_range INT, n_duplicate INT, n_stuck INT, n_missing_hour INT,
+                n_rejected INT, checked_at TIMESTAMP)
+        """)
+    return eng
+
+
+def test_rejected_file_keeps_report(engine):
+    # every value is a 9999 sentinel -> 100% rejected -> file fails
+    df = _long_df([9999.0] * 24)
+    with pytest.raises(QualityError):
+        run_quality("2025-01.xlsx", df, engine)
+
+    with engine.connect() as conn:
+        summary = conn.exec_driver_sql(
+            "SELECT station_name, n_rows, n_out_of_range, n_rejected FROM quality_summary "
+            "WHERE file_name = '2025-01.xlsx'").all()
+        n_flags = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM quality_flag WHERE flag = 'out_of_range'").scalar()
+    assert summary == [("시청", 24, 24, 24)]
+    assert n_flags == 24
+
+
+def test_accepted_file_drops_flagged_rows(engine):
+    levels = [60.0 + i * 0.1 for i in range(24)]
+    levels[3] = np.nan
+    levels[5] = 150.0
+    clean = run_quality("2025-02.xlsx", _long_df(levels), engine)
+    assert len(clean) == 22
+    assert clean["db_level"].notna().all()
+
+
+def test_policy_fail_and_allowed_actions():
+    levels = [60.0 + i * 0.1 for i in range(24)]
+    levels[0] = np.nan
+    with pytest.raises(QualityError):
+        validate_hours(_long_df(levels), {"unparsable": "fail"})
+    with pytest.raises(ValueError):
+        check_policy({"unparsable": "keep"})
+
+
+def test_policy_from_config(tmp_path):
+    cfg = tmp_path / "config.env"
+    cfg.write_text("host=localhost\nquality_stuck=drop\nquality_max_reject_ratio=0.2\n",
+                   encoding="utf-8")
+    qc = load_quality_config(cfg)
+    assert qc["policy"]["stuck"] == "drop"
+    assert qc["max_reject_ratio"] == 0.2
+
+
+def test_keep_out_of_range_still_drops_unstorable():
+    levels = [60.0 + i * 0.1 for i in range(24)]
+    levels[2] = 140.0
+    levels[5] = 9999.0
+    clean, flags, _ = validate_hours(_long_df(levels), {"out_of_range": "keep"})
+    assert len(clean) == 23
+    assert 140.0 in clean["db_level"].tolist()
+    assert 9999.0 not in clean["db_level"].tolist()
+    actions = flags.set_index("db_level")["action"]
+    assert actions[140.0] == "keep" and actions[9999.0] == "drop"